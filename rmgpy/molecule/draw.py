@@ -49,6 +49,8 @@ import logging
 import math
 import os.path
 import re
+import sys
+from collections import OrderedDict
 
 try:
     import cairocffi as cairo
@@ -63,6 +65,22 @@ from rdkit.Chem import AllChem
 from rmgpy.molecule.molecule import Molecule
 from rmgpy.qm.molecule import Geometry
 
+# Cache of the 2D coordinates generated for recently drawn molecules, shared by
+# all MoleculeDrawer instances and ordered from least to most recently used
+_coordinates_cache = OrderedDict()
+_COORDINATES_CACHE_SIZE = 4096
+
+# Bond vectors closer together than this are taken to point to the same position
+_POSITION_TOLERANCE = 1e-4
+
+# Pattern used to split an atom label into its constituent atoms, e.g. 'CH3'
+_SYMBOL_REGEX = re.compile('[A-Z][a-z]*[0-9]*')
+
+# Suffixes appended to atom labels for the most common numbers of implicit hydrogens
+_H_SUFFIX = ('', 'H', 'H2', 'H3', 'H4', 'H5', 'H6', 'H7', 'H8')
+
+# Cache of the interned atom labels for each (symbol, implicit hydrogens) pair
+_label_cache = {}
 
 ################################################################################
 
@@ -94,6 +112,123 @@ def create_new_surface(file_format, target=None, width=1024, height=768):
     return surface
 
 
+def _get_occupied_positions(vectors):
+    """
+    Return the bond positions occupied by the given 2D bond `vectors`, for use
+    with :func:`_is_occupied`, as a dict mapping cells of a square grid with a
+    spacing of `_POSITION_TOLERANCE` to the list of vectors in each cell.
+    """
+    occupied_positions = {}
+    for x, y in vectors:
+        cell = (math.floor(x / _POSITION_TOLERANCE), math.floor(y / _POSITION_TOLERANCE))
+        occupied_positions.setdefault(cell, []).append((x, y))
+    return occupied_positions
+
+
+def _is_occupied(x, y, occupied_positions):
+    """
+    Return ``True`` if the 2D bond vector (`x`, `y`) is closer than
+    `_POSITION_TOLERANCE` to any of the `occupied_positions` returned by
+    :func:`_get_occupied_positions`, or ``False`` if not. Any such vector lies
+    in the same grid cell or one of the eight cells around it, so only those
+    cells are searched.
+    """
+    i = math.floor(x / _POSITION_TOLERANCE)
+    j = math.floor(y / _POSITION_TOLERANCE)
+    for cell in ((i - 1, j - 1), (i - 1, j), (i - 1, j + 1), (i, j - 1), (i, j),
+                 (i, j + 1), (i + 1, j - 1), (i + 1, j), (i + 1, j + 1)):
+        for x2, y2 in occupied_positions.get(cell, ()):
+            if math.hypot(x - x2, y - y2) < _POSITION_TOLERANCE:
+                return True
+    return False
+
+
+def _find_unoccupied_vector(vector, angle, occupied_positions, max_steps):
+    """
+    Rotate the 2D bond `vector` counterclockwise by `angle` until it points to
+    a position not in `occupied_positions`, as returned by
+    :func:`_get_occupied_positions`, making at most `max_steps` rotations.
+    Returns the rotated vector.
+    """
+    cos_angle = math.cos(angle)
+    sin_angle = math.sin(angle)
+    x, y = vector
+    for _ in range(max_steps):
+        x, y = cos_angle * x - sin_angle * y, sin_angle * x + cos_angle * y
+        if not _is_occupied(x, y, occupied_positions):
+            break
+    return np.array([x, y], np.float64)
+
+
+def _get_orientation(angle):
+    """
+    Return the side - ``'r'``, ``'t'``, ``'l'``, or ``'b'`` - towards which a
+    direction with the given `angle` in radians points, as used to place the
+    radicals and charges around an atom. Each side covers the 90 degree sector
+    centered on the corresponding axis, and the sectors are half-open so that
+    the boundary angles are assigned counterclockwise.
+    """
+    return 'brtl'[int((angle + 3 * math.pi / 4) // (math.pi / 2)) % 4]
+
+
+def _get_adjacency(atoms, atom_indices):
+    """
+    Return the bonds between the given list of `atoms` in compressed sparse row
+    form, as the tuple (`indptr`, `neighbors`, `bonds`). The indices of the
+    atoms bonded to the atom at index ``i`` are given by
+    ``neighbors[indptr[i]:indptr[i + 1]]``, and the corresponding :class:`Bond`
+    objects by ``bonds[indptr[i]:indptr[i + 1]]``. The dict `atom_indices`
+    maps each atom to its index in `atoms`.
+    """
+    indptr = np.zeros(len(atoms) + 1, np.int32)
+    neighbors = []
+    bonds = []
+    for i, atom in enumerate(atoms):
+        for atom2, bond in atom.bonds.items():
+            neighbors.append(atom_indices[atom2])
+            bonds.append(bond)
+        indptr[i + 1] = len(neighbors)
+    return indptr, np.array(neighbors, np.int32), bonds
+
+
+def _get_label(symbol, h_count):
+    """
+    Return the label for an atom with the given element `symbol` and number of
+    implicit hydrogens `h_count`, e.g. ``'CH3'``. The labels are interned and
+    cached, so each distinct label is only built once.
+    """
+    key = (symbol, h_count)
+    try:
+        return _label_cache[key]
+    except KeyError:
+        label = sys.intern(symbol + (_H_SUFFIX[h_count] if h_count < len(_H_SUFFIX) else f'H{h_count}'))
+        _label_cache[key] = label
+        return label
+
+
+def _propagate_labels(indptr, neighbors, multiple, labeled):
+    """
+    Label each unlabeled atom that has only double or triple bonds and is
+    connected to a labeled atom through a chain of such atoms. The bonds are
+    given in compressed sparse row form by `indptr` and `neighbors`, as
+    returned by :func:`_get_adjacency`, and `multiple` flags the atoms whose
+    bonds are all double or triple. The bytearray `labeled` of atom flags is
+    updated in place. Returns a list of the indices of the newly labeled atoms.
+    """
+    newly_labeled = []
+    stack = [i for i in range(len(labeled)) if labeled[i]]
+    unlabeled = len(labeled) - len(stack)
+    while stack and unlabeled > 0:
+        i = stack.pop()
+        for j in neighbors[indptr[i]:indptr[i + 1]]:
+            if not labeled[j] and multiple[j]:
+                labeled[j] = 1
+                newly_labeled.append(j)
+                stack.append(j)
+                unlabeled -= 1
+    return newly_labeled
+
+
 ################################################################################
 
 class MoleculeDrawer(object):
@@ -124,8 +259,10 @@ class MoleculeDrawer(object):
         self.cycles = None
         self.ringSystems = None
         self.coordinates = None
+        self.atom_indices = None
         self.symbols = None
         self.implicitHydrogens = None
+        self._text_extents_cache = {}
         self.left = 0.0
         self.top = 0.0
         self.right = 0.0
@@ -138,8 +275,10 @@ class MoleculeDrawer(object):
         self.cycles = None
         self.ringSystems = None
         self.coordinates = None
+        self.atom_indices = None
         self.symbols = None
         self.implicitHydrogens = None
+        self._text_extents_cache = {}
         self.left = 0.0
         self.top = 0.0
         self.right = 0.0
@@ -187,7 +326,7 @@ class MoleculeDrawer(object):
                         self.implicitHydrogens[atom2] += 1
                     except KeyError:
                         self.implicitHydrogens[atom2] = 1
-                self.molecule.remove_atom(atom)
+            self.molecule.remove_atoms(atoms_to_remove)
 
         # Generate information about any cycles present in the molecule, as
         # they will need special attention
@@ -202,12 +341,31 @@ class MoleculeDrawer(object):
         else:
             # Generate the coordinates to use to draw the molecule
             try:
-                # before getting coordinates, make all bonds single and then
-                # replace the bonds after generating coordinates. This avoids
-                # bugs with RDKit
-                old_bond_dictionary = self._make_single_bonds()
-                self._generate_coordinates()
-                self._replace_bonds(old_bond_dictionary)
+                # Reuse the coordinates of an identical molecule drawn before
+                key = self._get_coordinates_key()
+                try:
+                    order, coordinates = _coordinates_cache[key]
+                    _coordinates_cache.move_to_end(key)
+                    # Put the atoms in the order they were left in when the
+                    # coordinates were generated, so that they match the cached
+                    # coordinates and are labeled the same way
+                    atoms = self.molecule.atoms
+                    self.molecule.atoms = [atoms[i] for i in order]
+                    self.coordinates = coordinates.copy()
+                except KeyError:
+                    # Generating the coordinates with RDKit sorts the atoms, so
+                    # also cache the resulting atom order relative to the key
+                    atom_indices = {atom: i for i, atom in enumerate(self.molecule.atoms)}
+                    # before getting coordinates, make all bonds single and then
+                    # replace the bonds after generating coordinates. This avoids
+                    # bugs with RDKit
+                    old_bond_dictionary = self._make_single_bonds()
+                    self._generate_coordinates()
+                    self._replace_bonds(old_bond_dictionary)
+                    order = [atom_indices[atom] for atom in self.molecule.atoms]
+                    _coordinates_cache[key] = (order, self.coordinates.copy())
+                    if len(_coordinates_cache) > _COORDINATES_CACHE_SIZE:
+                        _coordinates_cache.popitem(last=False)
 
                 # Generate labels to use
                 self._generate_atom_labels()
@@ -225,8 +383,9 @@ class MoleculeDrawer(object):
                               ' they cannot be sent to RDKit for coordinate placing.')
                 raise
 
-        self.coordinates[:, 1] *= -1
-        self.coordinates *= self.options['bondLength']
+        # Flip the y-axis (Cairo's points down) and scale to the bond length
+        bond_length = self.options['bondLength']
+        self.coordinates = self.coordinates * np.array([bond_length, -bond_length], np.float64)
 
         # Handle some special cases
         if self.symbols == ['H', 'H']:
@@ -260,7 +419,7 @@ class MoleculeDrawer(object):
             # Render as H2::X instead of crashing on H-H::X (vdW bond)
             self.molecule.remove_atom(self.molecule.atoms[0])
             self.symbols = ['H2', 'X']
-            self.coordinates = np.array([[0, -0.5], [0, 0.5]], np.float64) * self.options['bondLength']
+            self.coordinates = np.array([[0, -0.5], [0, 0.5]], np.float64) * bond_length
 
         # Create a dummy surface to draw to, since we don't know the bounding rect
         # We will copy this to another surface with the correct bounding rect
@@ -322,6 +481,21 @@ class MoleculeDrawer(object):
                 if not found:
                     self.ringSystems.append([cycle])
 
+    def _get_coordinates_key(self):
+        """
+        Return a hashable key identifying the 2D coordinates generated for the
+        current molecule. The key depends on the element, charge, and radical
+        electrons of each atom and on the connectivity of the atoms, all in
+        the order of the atom list, so molecules with the same key are laid
+        out identically. Bond orders are not included since all bonds are
+        made single before the coordinates are generated.
+        """
+        atoms = self.molecule.atoms
+        atom_indices = {atom: i for i, atom in enumerate(atoms)}
+        return tuple((atom.symbol, atom.charge, atom.radical_electrons,
+                      tuple(atom_indices[atom2] for atom2 in atom.bonds))
+                     for atom in atoms)
+
     def _generate_coordinates(self):
         """
         Generate the 2D coordinates to be used when drawing the current 
@@ -331,6 +505,9 @@ class MoleculeDrawer(object):
         atoms = self.molecule.atoms
         natoms = len(atoms)
 
+        # Map each atom to its position in the atom list (and coordinates array)
+        self.atom_indices = atom_indices = {atom: i for i, atom in enumerate(atoms)}
+
         # Initialize array of coordinates
         self.coordinates = coordinates = np.zeros((natoms, 2))
 
@@ -374,15 +551,13 @@ class MoleculeDrawer(object):
 
                 # If backbone is linear, then rotate so that the bond is parallel to the
                 # horizontal axis
-                vector0 = coordinates[atoms.index(backbone[1]), :] - coordinates[atoms.index(backbone[0]), :]
-                for i in range(2, len(backbone)):
-                    vector = coordinates[atoms.index(backbone[i]), :] - coordinates[atoms.index(backbone[i - 1]), :]
-                    if np.linalg.norm(vector - vector0) > 1e-4:
-                        break
-                else:
+                backbone_vectors = np.diff(coordinates[[atom_indices[atom] for atom in backbone], :], axis=0)
+                vector0 = backbone_vectors[0, :]
+                deviations = backbone_vectors[1:, :] - vector0
+                if np.all(np.hypot(deviations[:, 0], deviations[:, 1]) <= 1e-4):
                     angle = math.atan2(vector0[0], vector0[1]) - math.pi / 2
-                    rot = np.array([[math.cos(angle), math.sin(angle)],
-                                    [-math.sin(angle), math.cos(angle)]], np.float64)
+                    cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+                    rot = np.array([[cos_angle, sin_angle], [-sin_angle, cos_angle]], np.float64)
                     # need to keep self.coordinates and coordinates referring to the same object
                     self.coordinates = coordinates = np.dot(coordinates, rot)
             
@@ -391,8 +566,8 @@ class MoleculeDrawer(object):
             # as leaving everything piled on top of each other at the origin
             import itertools
             for atom1, atom2 in itertools.combinations(backbone, 2):
-                i1, i2 = atoms.index(atom1), atoms.index(atom2)
-                if np.linalg.norm(coordinates[i1, :] - coordinates[i2, :]) < 0.5:
+                i1, i2 = atom_indices[atom1], atom_indices[atom2]
+                if math.hypot(coordinates[i1, 0] - coordinates[i2, 0], coordinates[i1, 1] - coordinates[i2, 1]) < 0.5:
                     coordinates[i1, 0] -= 0.3
                     coordinates[i2, 0] += 0.3
                     coordinates[i1, 1] -= 0.2
@@ -403,24 +578,16 @@ class MoleculeDrawer(object):
             # as leaving everything piled on top of each other at the origin
             import itertools
             for atom1, atom2 in itertools.combinations(backbone, 2):
-                i1, i2 = atoms.index(atom1), atoms.index(atom2)
-                if np.linalg.norm(coordinates[i1, :] - coordinates[i2, :]) < 0.5:
+                i1, i2 = atom_indices[atom1], atom_indices[atom2]
+                if math.hypot(coordinates[i1, 0] - coordinates[i2, 0], coordinates[i1, 1] - coordinates[i2, 1]) < 0.5:
                     coordinates[i1, 0] -= 0.3
                     coordinates[i2, 0] += 0.3
                     coordinates[i1, 1] -= 0.2
                     coordinates[i2, 1] += 0.2
 
             # Center backbone at origin
-            xmin = np.min(coordinates[:, 0])
-            xmax = np.max(coordinates[:, 0])
-            ymin = np.min(coordinates[:, 1])
-            ymax = np.max(coordinates[:, 1])
-            xmid = 0.5 * (xmax + xmin)
-            ymid = 0.5 * (ymax + ymin)
-            for atom in backbone:
-                index = atoms.index(atom)
-                coordinates[index, 0] -= xmid
-                coordinates[index, 1] -= ymid
+            midpoint = 0.5 * (np.min(coordinates, axis=0) + np.max(coordinates, axis=0))
+            coordinates[[atom_indices[atom] for atom in backbone], :] -= midpoint
 
             # We now proceed by calculating the coordinates of the functional groups
             # attached to the backbone
@@ -447,6 +614,10 @@ class MoleculeDrawer(object):
                 point = rdmol.GetConformer(0).GetAtomPosition(index)
                 coordinates[index, :] = [point.x * 0.6, point.y * 0.6]
 
+            # Converting to RDKit sorts the atoms in place, so map each atom to
+            # its new position in the atom list (and coordinates array)
+            self.atom_indices = atom_indices = {atom: i for i, atom in enumerate(self.molecule.atoms)}
+
             # RDKit generates some molecules more vertically than horizontally,
             # Especially linear ones. This will reflect any molecule taller than
             # it is wide across the line y=x
@@ -467,13 +638,14 @@ class MoleculeDrawer(object):
                 raise Exception("Can't find surface site")
             if site.bonds:
                 adsorbate = next(iter(site.bonds))
-                vector0 = coordinates[atoms.index(site), :] - coordinates[atoms.index(adsorbate), :]
+                vector0 = coordinates[atom_indices[site], :] - coordinates[atom_indices[adsorbate], :]
                 angle = math.atan2(vector0[0], vector0[1]) - math.pi
-                rot = np.array([[math.cos(angle), math.sin(angle)], [-math.sin(angle), math.cos(angle)]], np.float64)
+                cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+                rot = np.array([[cos_angle, sin_angle], [-sin_angle, cos_angle]], np.float64)
                 self.coordinates = coordinates = np.dot(coordinates, rot)
             else:
                 # van der waals
-                index = atoms.index(site)
+                index = atom_indices[site]
                 coordinates[index, 1] = min(coordinates[:, 1]) - 0.8  # just move the site down a bit
                 coordinates[index, 0] = coordinates[:, 0].mean()  # and center it
 
@@ -535,16 +707,20 @@ class MoleculeDrawer(object):
         current molecule. The atoms are assumed to already be in a path, with
          ``atoms0[0]`` being a terminal atom.
         """
-        atom1 = atoms0[-1]
         paths = []
-        for atom2 in atom1.bonds:
-            if atom2 not in atoms0:
-                atoms = atoms0[:]
-                atoms.append(atom2)
-                if not self.molecule.is_atom_in_cycle(atom2):
-                    paths.extend(self._find_straight_chain_paths(atoms))
-        if len(paths) == 0:
-            paths.append(atoms0[:])
+        # Depth-first search using an explicit stack of partial paths, each
+        # stored alongside the set of its atoms for fast membership tests
+        stack = [(atoms0[:], set(atoms0))]
+        while stack:
+            atoms, visited = stack.pop()
+            branches = [atom2 for atom2 in atoms[-1].bonds
+                        if atom2 not in visited and not self.molecule.is_atom_in_cycle(atom2)]
+            if branches:
+                # Push in reverse so that paths are returned in bond order
+                for atom2 in reversed(branches):
+                    stack.append((atoms + [atom2], visited | {atom2}))
+            else:
+                paths.append(atoms)
         return paths
 
     def _generate_ring_system_coordinates(self, atoms):
@@ -564,7 +740,7 @@ class MoleculeDrawer(object):
         angle = - 2 * math.pi / len(cycle)
         radius = 1.0 / (2 * math.sin(math.pi / len(cycle)))
         for i, atom in enumerate(cycle):
-            index = self.molecule.atoms.index(atom)
+            index = self.atom_indices[atom]
             coordinates[index, :] = [math.cos(math.pi / 2 + i * angle), math.sin(math.pi / 2 + i * angle)]
             coordinates[index, :] *= radius
         atoms.remove(cycle)
@@ -623,10 +799,7 @@ class MoleculeDrawer(object):
             if len(common_atoms) == 1 or len(common_atoms) == 2:
                 # Center of new cycle is reflection of center of adjacent cycle
                 # across common atom or bond
-                center = np.zeros(2, np.float64)
-                for atom in common_atoms:
-                    center += coordinates[self.molecule.atoms.index(atom), :]
-                center /= len(common_atoms)
+                center = coordinates[[self.atom_indices[atom] for atom in common_atoms], :].mean(axis=0)
                 vector = center - center0
                 center += vector
                 radius = 1.0 / (2 * math.sin(math.pi / len(cycle)))
@@ -634,9 +807,9 @@ class MoleculeDrawer(object):
             else:
                 # Use any three points to determine the point equidistant from these
                 # three; this is the center
-                index0 = self.molecule.atoms.index(common_atoms[0])
-                index1 = self.molecule.atoms.index(common_atoms[1])
-                index2 = self.molecule.atoms.index(common_atoms[2])
+                index0 = self.atom_indices[common_atoms[0]]
+                index1 = self.atom_indices[common_atoms[1]]
+                index2 = self.atom_indices[common_atoms[2]]
                 A = np.zeros((2, 2), np.float64)
                 b = np.zeros((2), np.float64)
                 A[0, :] = 2 * (coordinates[index1, :] - coordinates[index0, :])
@@ -644,7 +817,7 @@ class MoleculeDrawer(object):
                 b[0] = coordinates[index1, 0] ** 2 + coordinates[index1, 1] ** 2 - coordinates[index0, 0] ** 2 - coordinates[index0, 1] ** 2
                 b[1] = coordinates[index2, 0] ** 2 + coordinates[index2, 1] ** 2 - coordinates[index0, 0] ** 2 - coordinates[index0, 1] ** 2
                 center = np.linalg.solve(A, b)
-                radius = np.linalg.norm(center - coordinates[index0, :])
+                radius = math.hypot(center[0] - coordinates[index0, 0], center[1] - coordinates[index0, 1])
 
             start_angle = 0.0
             end_angle = 0.0
@@ -670,11 +843,11 @@ class MoleculeDrawer(object):
             count = 1
             for i in range(len(common_atoms), len(cycle)):
                 angle = start_angle + count * d_angle
-                index = self.molecule.atoms.index(cycle[i])
+                index = self.atom_indices[cycle[i]]
                 # Check that we aren't reassigning any atom positions
                 # This version assumes that no atoms belong at the origin, which is
                 # usually fine because the first ring is centered at the origin
-                if np.linalg.norm(coordinates[index, :]) < 1e-4:
+                if math.hypot(coordinates[index, 0], coordinates[index, 1]) < 1e-4:
                     vector = np.array([math.cos(angle), math.sin(angle)], np.float64)
                     coordinates[index, :] = center + radius * vector
                 count += 1
@@ -690,29 +863,23 @@ class MoleculeDrawer(object):
         coordinates = self.coordinates
 
         # First atom goes at origin
-        index0 = self.molecule.atoms.index(atoms[0])
-        coordinates[index0, :] = [0.0, 0.0]
-
-        # Second atom goes on x-axis (for now; this could be improved!)
-        index1 = self.molecule.atoms.index(atoms[1])
-        vector = np.array([1.0, 0.0], np.float64)
+        # Second atom goes on x-axis (for now; this could be improved!), rotated
+        # by 30 degrees unless the first bond is a triple bond
+        # The direction of each subsequent bond is stored as a rotation relative
+        # to the previous bond, so that all of the coordinates can be computed
+        # at once at the end
+        rotations = np.zeros(len(atoms) - 1, np.float64)
         if atoms[0].bonds[atoms[1]].is_triple():
             rotate_positive = False
         else:
             rotate_positive = True
-            rot = np.array([[math.cos(-math.pi / 6), math.sin(-math.pi / 6)],
-                            [-math.sin(-math.pi / 6), math.cos(-math.pi / 6)]], np.float64)
-            vector = np.array([1.0, 0.0], np.float64)
-            vector = np.dot(rot, vector)
-        coordinates[index1, :] = coordinates[index0, :] + vector
+            rotations[0] = math.pi / 6
 
         # Other atoms
         for i in range(2, len(atoms)):
             atom0 = atoms[i - 2]
             atom1 = atoms[i - 1]
             atom2 = atoms[i]
-            index1 = self.molecule.atoms.index(atom1)
-            index2 = self.molecule.atoms.index(atom2)
             bond0 = atom0.bonds[atom1]
             bond = atom1.bonds[atom2]
             # Angle of next bond depends on the number of bonds to the start atom
@@ -736,31 +903,37 @@ class MoleculeDrawer(object):
             elif num_bonds == 6:
                 # Rotate by 0 degrees towards horizontal axis (to get angle of 180)
                 angle = 0.0
-            # Determine coordinates for atom
+            # Determine rotation of bond, alternating directions
             if angle != 0:
                 if not rotate_positive: angle = -angle
-                rot = np.array([[math.cos(angle), math.sin(angle)], [-math.sin(angle), math.cos(angle)]], np.float64)
-                vector = np.dot(rot, vector)
+                rotations[i - 1] = -angle
                 rotate_positive = not rotate_positive
-            coordinates[index2, :] = coordinates[index1, :] + vector
+
+        # Accumulate the rotations into bond directions, and the bond vectors
+        # into atom positions
+        directions = np.cumsum(rotations)
+        vectors = np.column_stack((np.cos(directions), np.sin(directions)))
+        indices = [self.atom_indices[atom] for atom in atoms]
+        coordinates[indices[0], :] = [0.0, 0.0]
+        coordinates[indices[1:], :] = np.cumsum(vectors, axis=0)
 
     def _generate_neighbor_coordinates(self, backbone):
         """
         Recursively update the coordinates for the atoms immediately adjacent
         to the atoms in the molecular `backbone`.
         """
-        atoms = self.molecule.atoms
+        atom_indices = self.atom_indices
         coordinates = self.coordinates
 
         for i in range(len(backbone)):
             atom0 = backbone[i]
-            index0 = atoms.index(atom0)
+            index0 = atom_indices[atom0]
 
             # Determine bond angles of all previously-determined bond locations for
             # this atom
             bond_angles = []
             for atom1 in atom0.bonds:
-                index1 = atoms.index(atom1)
+                index1 = atom_indices[atom1]
                 if atom1 in backbone:
                     vector = coordinates[index1, :] - coordinates[index0, :]
                     angle = math.atan2(vector[1], vector[0])
@@ -777,33 +950,24 @@ class MoleculeDrawer(object):
                 # All the bonds around each atom are equally spaced
                 # We just need to fill in the missing bond locations
 
-                # Determine rotation angle and matrix
-                rot = np.array([[math.cos(best_angle), -math.sin(best_angle)],
-                                [math.sin(best_angle), math.cos(best_angle)]], np.float64)
                 # Determine the vector of any currently-existing bond from this atom
                 vector = None
                 for atom1 in atom0.bonds:
-                    index1 = atoms.index(atom1)
-                    if atom1 in backbone or np.linalg.norm(coordinates[index1, :]) > 1e-4:
+                    index1 = atom_indices[atom1]
+                    if atom1 in backbone or math.hypot(coordinates[index1, 0], coordinates[index1, 1]) > 1e-4:
                         vector = coordinates[index1, :] - coordinates[index0, :]
 
                 # Iterate through each neighboring atom to this backbone atom
                 # If the neighbor is not in the backbone and does not yet have
                 # coordinates, then we need to determine coordinates for it
                 for atom1 in atom0.bonds:
-                    if atom1 not in backbone and np.linalg.norm(coordinates[atoms.index(atom1), :]) < 1e-4:
-                        occupied = True
-                        count = 0
+                    index1 = atom_indices[atom1]
+                    if atom1 not in backbone and math.hypot(coordinates[index1, 0], coordinates[index1, 1]) < 1e-4:
+                        occupied_positions = _get_occupied_positions(
+                            (coordinates[[atom_indices[atom2] for atom2 in atom0.bonds], :] - coordinates[index0, :]).tolist())
                         # Rotate vector until we find an unoccupied location
-                        while occupied and count < len(atom0.bonds):
-                            count += 1
-                            occupied = False
-                            vector = np.dot(rot, vector)
-                            for atom2 in atom0.bonds:
-                                index2 = atoms.index(atom2)
-                                if np.linalg.norm(coordinates[index2, :] - coordinates[index0, :] - vector) < 1e-4:
-                                    occupied = True
-                        coordinates[atoms.index(atom1), :] = coordinates[index0, :] + vector
+                        vector = _find_unoccupied_vector(vector, best_angle, occupied_positions, len(atom0.bonds))
+                        coordinates[index1, :] = coordinates[index0, :] + vector
                         self._generate_functional_group_coordinates(atom0, atom1)
 
             else:
@@ -820,12 +984,12 @@ class MoleculeDrawer(object):
 
                 index = 1
                 for atom1 in atom0.bonds:
-                    if atom1 not in backbone and np.linalg.norm(coordinates[atoms.index(atom1), :]) < 1e-4:
+                    index1 = atom_indices[atom1]
+                    if atom1 not in backbone and math.hypot(coordinates[index1, 0], coordinates[index1, 1]) < 1e-4:
                         angle = start_angle + index * d_angle
                         index += 1
                         vector = np.array([math.cos(angle), math.sin(angle)], np.float64)
-                        vector /= np.linalg.norm(vector)
-                        coordinates[atoms.index(atom1), :] = coordinates[index0, :] + vector
+                        coordinates[index1, :] = coordinates[index0, :] + vector
                         self._generate_functional_group_coordinates(atom0, atom1)
 
     def _generate_functional_group_coordinates(self, atom0, atom1):
@@ -839,11 +1003,11 @@ class MoleculeDrawer(object):
         recursive.
         """
 
-        atoms = self.molecule.atoms
+        atom_indices = self.atom_indices
         coordinates = self.coordinates
 
-        index0 = atoms.index(atom0)
-        index1 = atoms.index(atom1)
+        index0 = atom_indices[atom0]
+        index1 = atom_indices[atom1]
 
         # Determine the vector of any currently-existing bond from this atom
         # (We use the bond to the previous atom here)
@@ -867,24 +1031,22 @@ class MoleculeDrawer(object):
 
             coordinates_cycle = np.zeros_like(self.coordinates)
             for atom in cycle_atoms:
-                coordinates_cycle[atoms.index(atom), :] = coordinates[atoms.index(atom), :]
+                coordinates_cycle[atom_indices[atom], :] = coordinates[atom_indices[atom], :]
 
             # Rotate the ring system coordinates so that the line connecting atom1
             # and the center of mass of the ring is parallel to that between
             # atom0 and atom1
-            center = np.zeros(2, np.float64)
-            for atom in cycle_atoms:
-                center += coordinates_cycle[atoms.index(atom), :]
-            center /= len(cycle_atoms)
-            vector0 = center - coordinates_cycle[atoms.index(atom1), :]
+            center = coordinates_cycle[[atom_indices[atom] for atom in cycle_atoms], :].mean(axis=0)
+            vector0 = center - coordinates_cycle[atom_indices[atom1], :]
             angle = math.atan2(vector[1] - vector0[1], vector[0] - vector0[0])
-            rot = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]], np.float64)
+            cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+            rot = np.array([[cos_angle, -sin_angle], [sin_angle, cos_angle]], np.float64)
             coordinates_cycle = np.dot(coordinates_cycle, rot)
 
             # Translate the ring system coordinates to the position of atom1
-            coordinates_cycle += coordinates[atoms.index(atom1), :] - coordinates_cycle[atoms.index(atom1), :]
+            coordinates_cycle += coordinates[atom_indices[atom1], :] - coordinates_cycle[atom_indices[atom1], :]
             for atom in cycle_atoms:
-                coordinates[atoms.index(atom), :] = coordinates_cycle[atoms.index(atom), :]
+                coordinates[atom_indices[atom], :] = coordinates_cycle[atom_indices[atom], :]
 
             # Generate coordinates for remaining neighbors of ring system,
             # continuing to recurse as needed
@@ -893,7 +1055,7 @@ class MoleculeDrawer(object):
         else:
             # atom1 is not in any rings, so we can continue as normal
 
-            # Determine rotation angle and matrix
+            # Determine rotation angle
             num_bonds = len(atom1.bonds)
             angle = 0.0
             if num_bonds == 2:
@@ -904,35 +1066,23 @@ class MoleculeDrawer(object):
                     angle = 2 * math.pi / 3
                     # Make sure we're rotating such that we move away from the origin,
                     # to discourage overlap of functional groups
-                    rot1 = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]], np.float64)
-                    rot2 = np.array([[math.cos(angle), math.sin(angle)], [-math.sin(angle), math.cos(angle)]], np.float64)
-                    vector1 = coordinates[index1, :] + np.dot(rot1, vector)
-                    vector2 = coordinates[index1, :] + np.dot(rot2, vector)
                     if bond_angle < -0.5 * math.pi or bond_angle > 0.5 * math.pi:
                         angle = abs(angle)
                     else:
                         angle = -abs(angle)
             else:
                 angle = 2 * math.pi / num_bonds
-            rot = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]], np.float64)
 
             # Iterate through each neighboring atom to this backbone atom
             # If the neighbor is not in the backbone, then we need to determine
             # coordinates for it
             for atom, bond in atom1.bonds.items():
                 if atom is not atom0:
-                    occupied = True
-                    count = 0
+                    occupied_positions = _get_occupied_positions(
+                        (coordinates[[atom_indices[atom2] for atom2 in atom1.bonds], :] - coordinates[index1, :]).tolist())
                     # Rotate vector until we find an unoccupied location
-                    while occupied and count < len(atom1.bonds):
-                        count += 1
-                        occupied = False
-                        vector = np.dot(rot, vector)
-                        for atom2 in atom1.bonds:
-                            index2 = atoms.index(atom2)
-                            if np.linalg.norm(coordinates[index2, :] - coordinates[index1, :] - vector) < 1e-4:
-                                occupied = True
-                    coordinates[atoms.index(atom), :] = coordinates[index1, :] + vector
+                    vector = _find_unoccupied_vector(vector, angle, occupied_positions, len(atom1.bonds))
+                    coordinates[atom_indices[atom], :] = coordinates[index1, :] + vector
 
                     # Recursively continue with functional group
                     self._generate_functional_group_coordinates(atom1, atom)
@@ -946,35 +1096,38 @@ class MoleculeDrawer(object):
         explicitly drawn in the skeletal formula).
         """
         atoms = self.molecule.atoms
+        atom_indices = {atom: i for i, atom in enumerate(atoms)}
+
+        # Get the bonds of each atom by index in compressed sparse row form
+        indptr, neighbors, bonds = _get_adjacency(atoms, atom_indices)
+        indptr = indptr.tolist()
 
-        self.symbols = symbols = [atom.symbol for atom in atoms]
-        for i in range(len(symbols)):
-            # Don't label carbon atoms, unless there are only one or two heavy atoms
-            # or they are isotopically labeled
-            if symbols[i] == 'C' and len(symbols) > 2:
-                if (len(atoms[i].bonds) > 1 or (atoms[i].radical_electrons == 0 and atoms[i].charge == 0)) \
-                        and atoms[i].element.isotope == -1:
-                    symbols[i] = ''
+        natoms = len(atoms)
+        labeled = bytearray(b'\x01') * natoms
+        # Don't label carbon atoms, unless there are only one or two heavy atoms
+        # or they are isotopically labeled
+        if natoms > 2:
+            for i, atom in enumerate(atoms):
+                if atom.symbol == 'C' and atom.element.isotope == -1 and \
+                        (indptr[i + 1] - indptr[i] > 1 or (atom.radical_electrons == 0 and atom.charge == 0)):
+                    labeled[i] = 0
         # Do label atoms that have only double bonds to one or more labeled atoms
-        changed = True
-        while changed:
-            changed = False
-            for i in range(len(symbols)):
-                if (symbols[i] == '' and all([(bond.is_double() or bond.is_triple()) for bond in atoms[i].bonds.values()])
-                        and any([symbols[atoms.index(atom)] != '' for atom in atoms[i].bonds])):
-                    symbols[i] = atoms[i].symbol
-                    changed = True
-        # Add implicit hydrogens
-        for i in range(len(symbols)):
-            if symbols[i] != '':
-                try:
-                    h_count = self.implicitHydrogens[atoms[i]]
-                except KeyError:
-                    continue
-                if h_count == 1:
-                    symbols[i] = symbols[i] + 'H'
-                elif h_count > 1:
-                    symbols[i] = symbols[i] + 'H{0:d}'.format(h_count)
+        # Only a newly labeled atom can cause its neighbors to be labeled, so
+        # the labels are propagated outward from the labeled atoms
+        # This is skipped if no atoms are labeled or all of them already are
+        if 0 < labeled.count(1) < natoms:
+            all_multiple = [all(bond.is_double() or bond.is_triple() for bond in bonds[indptr[i]:indptr[i + 1]])
+                            for i in range(natoms)]
+            _propagate_labels(indptr, neighbors.tolist(), all_multiple, labeled)
+
+        # Build the label of each labeled atom, including any implicit hydrogens
+        implicit_hydrogens = self.implicitHydrogens
+        self.symbols = symbols = []
+        for atom, is_labeled in zip(atoms, labeled):
+            if is_labeled:
+                symbols.append(_get_label(atom.symbol, implicit_hydrogens.get(atom, 0)))
+            else:
+                symbols.append('')
 
         return symbols
 
@@ -990,6 +1143,8 @@ class MoleculeDrawer(object):
         coordinates = self.coordinates
         atoms = self.molecule.atoms
         symbols = self.symbols
+        self.atom_indices = atom_indices = {atom: i for i, atom in enumerate(atoms)}
+        self._text_extents_cache = {}
 
         draw_lone_pairs = False
 
@@ -997,23 +1152,30 @@ class MoleculeDrawer(object):
             if atom.is_nitrogen():
                 draw_lone_pairs = True
 
-        left = 0.0
-        top = 0.0
-        right = 0.0
-        bottom = 0.0
-
         # Shift coordinates by offset value
         if offset is not None:
-            coordinates[:, 0] += offset[0]
-            coordinates[:, 1] += offset[1]
+            coordinates += offset
+
+        # Get the bonds in compressed sparse row form, along with the index of
+        # the atom each row entry belongs to and the vector along each bond
+        indptr, neighbors, bonds = _get_adjacency(atoms, atom_indices)
+        rows = np.repeat(np.arange(len(atoms)), np.diff(indptr))
+        bond_vectors = coordinates[neighbors, :] - coordinates[rows, :]
+        # The per-atom loops below work with plain floats rather than NumPy scalars
+        points = coordinates.tolist()
 
         # Draw bonds
-        for atom1 in atoms:
-            for atom2, bond in atom1.bonds.items():
-                index1 = atoms.index(atom1)
-                index2 = atoms.index(atom2)
-                if index1 < index2:  # So we only draw each bond once
-                    self._render_bond(index1, index2, bond, cr)
+        # All bonds are drawn with the same line settings, so only set them once
+        cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
+        cr.set_line_width(1.0)
+        cr.set_line_cap(cairo.LINE_CAP_ROUND)
+        # Each bond is drawn once, from its lower-indexed atom; the unit normals
+        # of all of these bonds are determined together
+        drawn = np.flatnonzero(rows < neighbors)
+        angles = np.arctan2(bond_vectors[drawn, 1], bond_vectors[drawn, 0]) + math.pi / 2
+        normals = np.column_stack((np.cos(angles), np.sin(angles))).tolist()
+        for k, index1, index2, normal in zip(drawn.tolist(), rows[drawn].tolist(), neighbors[drawn].tolist(), normals):
+            self._render_bond(index1, index2, bonds[k], cr, normal)
 
         # Draw aromatic bonds
         for cycle in self.cycles:
@@ -1023,38 +1185,40 @@ class MoleculeDrawer(object):
             cycle_bonds.append(cycle[0].bonds[cycle[-1]])
             if all([bond.is_benzene() for bond in cycle_bonds]):
                 # We've found an aromatic ring, so draw a circle in the center to represent the benzene bonds
-                center = np.zeros(2, np.float64)
+                center_x = center_y = 0.0
                 for atom in cycle:
-                    index = atoms.index(atom)
-                    center += coordinates[index, :]
-                center /= len(cycle)
-                index1 = atoms.index(cycle[0])
-                index2 = atoms.index(cycle[1])
+                    x, y = points[atom_indices[atom]]
+                    center_x += x
+                    center_y += y
+                center_x /= len(cycle)
+                center_y /= len(cycle)
+                x1, y1 = points[atom_indices[cycle[0]]]
+                x2, y2 = points[atom_indices[cycle[1]]]
                 radius = math.sqrt(
-                    (center[0] - (coordinates[index1, 0] + coordinates[index2, 0]) / 2) ** 2 +
-                    (center[1] - (coordinates[index1, 1] + coordinates[index2, 1]) / 2) ** 2
+                    (center_x - (x1 + x2) / 2) ** 2 +
+                    (center_y - (y1 + y2) / 2) ** 2
                 ) - 4
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 cr.set_line_width(1.0)
                 cr.set_line_cap(cairo.LINE_CAP_ROUND)
-                cr.arc(center[0], center[1], radius, 0.0, 2 * math.pi)
+                cr.arc(center_x, center_y, radius, 0.0, 2 * math.pi)
                 cr.stroke()
 
         # Draw atoms
-        for i, atom in enumerate(atoms):
-            symbol = symbols[i]
-            index = atoms.index(atom)
-            x0, y0 = coordinates[index, :]
-            vector = np.zeros(2, np.float64)
-            for atom2 in atom.bonds:
-                vector += coordinates[atoms.index(atom2), :] - coordinates[index, :]
-            heavy_first = vector[0] <= 0
+        # The sum of the bond vectors of each atom determines the side on
+        # which to place any implicit hydrogens in its label
+        bond_vector_sums = np.zeros((len(atoms), 2), np.float64)
+        np.add.at(bond_vector_sums, rows, bond_vectors)
+        heavy_first_flags = (bond_vector_sums[:, 0] <= 0).tolist()
+        for index, atom in enumerate(atoms):
+            symbol = symbols[index]
+            x0, y0 = points[index]
+            heavy_first = heavy_first_flags[index]
             if (len(atoms) == 1 and atoms[0].symbol not in ['C', 'N'] and
                     atoms[0].charge == 0 and atoms[0].radical_electrons == 0):
                 # This is so e.g. water is rendered as H2O rather than OH2
                 heavy_first = False
-                cr.set_font_size(self.options['fontSizeNormal'])
-                x0 += cr.text_extents(symbols[0])[2] / 2.0
+                x0 += self._get_text_extents(cr, symbols[0], self.options['fontSizeNormal'])[2] / 2.0
             self._render_atom(symbol, atom, x0, y0, cr, heavy_first, draw_lone_pairs)
 
         # Add a small amount of whitespace on all sides
@@ -1064,23 +1228,37 @@ class MoleculeDrawer(object):
         self.right += padding
         self.bottom += padding
 
+    def _get_text_extents(self, cr, text, font_size):
+        """
+        Return the extents of the string `text` at the given `font_size` on the
+        Cairo context `cr`. The extents are cached for the duration of each call
+        to :meth:`render()`. The font size of `cr` is left unchanged.
+        """
+        key = (text, font_size)
+        try:
+            return self._text_extents_cache[key]
+        except KeyError:
+            cr.save()
+            cr.set_font_size(font_size)
+            extents = self._text_extents_cache[key] = cr.text_extents(text)
+            cr.restore()
+            return extents
+
     def _draw_line(self, cr, x1, y1, x2, y2, dashed=False, dash_sizes=None):
         """
         Draw a line on the given Cairo context `cr` from (`x1`, `y1`) to
-        (`x2`,`y2`), and update the bounding rectangle if necessary.
+        (`x2`,`y2`), and update the bounding rectangle if necessary. The line
+        is drawn using the current source, line width, and line cap of `cr`.
 
         For a dashed line set ``dashed=True``.
         Then the optional `dash_sizes` can be a list of on/off segment lengths,
         which defaults to [3.5, 3.5] if not specified.
         """
 
-        cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
-        cr.set_line_width(1.0)
         if dashed:
             if dash_sizes is None:
                 dash_sizes = [3.5, 3.5]
             cr.set_dash(dash_sizes)
-        cr.set_line_cap(cairo.LINE_CAP_ROUND)
         cr.move_to(x1, y1)
         cr.line_to(x2, y2)
         cr.stroke()
@@ -1104,10 +1282,10 @@ class MoleculeDrawer(object):
         if y2 > self.bottom:
             self.bottom = y2
 
-    def _render_bond(self, atom1, atom2, bond, cr):
+    def _render_bond(self, atom1, atom2, bond, cr, normal):
         """
         Render an individual `bond` between atoms with indices `atom1` and `atom2`
-        on the Cairo context `cr`.
+        on the Cairo context `cr`, given the unit `normal` (du, dv) to the bond.
         """
 
         bond_length = self.options['bondLength']
@@ -1126,14 +1304,12 @@ class MoleculeDrawer(object):
                     is_aromatic = True
                     break
 
-        x1, y1 = self.coordinates[atom1, :]
-        x2, y2 = self.coordinates[atom2, :]
-        angle = math.atan2(y2 - y1, x2 - x1)
+        x1, y1 = self.coordinates[atom1, :].tolist()
+        x2, y2 = self.coordinates[atom2, :].tolist()
 
         dx = x2 - x1
         dy = y2 - y1
-        du = math.cos(angle + math.pi / 2)
-        dv = math.sin(angle + math.pi / 2)
+        du, dv = normal
         if self.symbols[atom1] != '' or self.symbols[atom2] != '':
             if bond.is_quadruple():
                 # Draw quadruple bond centered on bond axis
@@ -1223,63 +1399,61 @@ class MoleculeDrawer(object):
         """
 
         atoms = self.molecule.atoms
+        atom_indices = self.atom_indices
 
         if symbol != '':
             heavy_atom = symbol[0]
 
             # Split label by atoms
-            labels = re.findall('[A-Z][a-z]*[0-9]*', symbol)
+            labels = _SYMBOL_REGEX.findall(symbol)
             if not heavy_first:
                 labels.reverse()
             if 'C' not in symbol and 'O' not in symbol and len(atoms) == 1:
                 labels.sort()
             symbol = ''.join(labels)
 
-            # Determine positions of each character in the symbol
+            # Determine the position and font size of each character in the
+            # symbol, along with the bounding box of the symbol as a whole
             coordinates = []
+            font_sizes = []
 
-            cr.set_font_size(self.options['fontSizeNormal'])
-            y0 += max([cr.text_extents(char)[3] for char in symbol if char.isalpha()]) / 2
-
-            for i, label in enumerate(labels):
-                for j, char in enumerate(label):
-                    cr.set_font_size(self.options['fontSizeSubscript' if char.isdigit() else 'fontSizeNormal'])
-                    xbearing, ybearing, width, height, xadvance, yadvance = cr.text_extents(char)
-                    if i == 0 and j == 0:
-                        # Center heavy atom at (x0, y0)
-                        x = x0 - width / 2.0 - xbearing
-                        y = y0
-                    else:
-                        # Left-justify other atoms (for now)
-                        x = x0
-                        y = y0
-                    if char.isdigit():
-                        y += height / 2.0
-                    coordinates.append((x, y))
-                    x0 = x + xadvance
+            font_size_normal = self.options['fontSizeNormal']
+            font_size_subscript = self.options['fontSizeSubscript']
+            y0 += max([self._get_text_extents(cr, char, font_size_normal)[3] for char in symbol if char.isalpha()]) / 2
 
             x = y = 1000000
             width = height = 0
-            start_width = end_width = 0
+            last = len(symbol) - 1
             for i, char in enumerate(symbol):
-                cr.set_font_size(self.options['fontSizeSubscript' if char.isdigit() else 'fontSizeNormal'])
-                extents = cr.text_extents(char)
-                if coordinates[i][0] + extents[0] < x:
-                    x = coordinates[i][0] + extents[0]
-                if coordinates[i][1] + extents[1] < y:
-                    y = coordinates[i][1] + extents[1]
-                width += extents[4] if i < len(symbol) - 1 else extents[2]
-                if extents[3] > height:
-                    height = extents[3]
+                is_digit = char.isdigit()
+                font_size = font_size_subscript if is_digit else font_size_normal
+                xbearing, ybearing, char_width, char_height, xadvance, yadvance = \
+                    self._get_text_extents(cr, char, font_size)
                 if i == 0:
-                    start_width = extents[2]
-                if i == len(symbol) - 1:
-                    end_width = extents[2]
+                    # Center heavy atom at (x0, y0)
+                    xi = x0 - char_width / 2.0 - xbearing
+                    start_width = char_width
+                else:
+                    # Left-justify other atoms (for now)
+                    xi = x0
+                yi = y0 + char_height / 2.0 if is_digit else y0
+                coordinates.append((xi, yi))
+                font_sizes.append(font_size)
+                x0 = xi + xadvance
+
+                if xi + xbearing < x:
+                    x = xi + xbearing
+                if yi + ybearing < y:
+                    y = yi + ybearing
+                width += xadvance if i < last else char_width
+                if char_height > height:
+                    height = char_height
+            end_width = char_width
 
             if not heavy_first:
-                for i in range(len(coordinates)):
-                    coordinates[i] = (coordinates[i][0] - (width - start_width / 2 - end_width / 2), coordinates[i][1])
-                x -= width - start_width / 2 - end_width / 2
+                shift = width - start_width / 2 - end_width / 2
+                coordinates = [(xi - shift, yi) for xi, yi in coordinates]
+                x -= shift
 
             # Background
             x1 = x - 2
@@ -1337,10 +1511,13 @@ class MoleculeDrawer(object):
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
 
             # Text itself
-            for i, char in enumerate(symbol):
-                cr.set_font_size(self.options['fontSizeSubscript' if char.isdigit() else 'fontSizeNormal'])
-                xbearing, ybearing, width, height, xadvance, yadvance = cr.text_extents(char)
-                xi, yi = coordinates[i]
+            # Only change the font size when switching between normal and
+            # subscript characters
+            current_font_size = None
+            for char, font_size, (xi, yi) in zip(symbol, font_sizes, coordinates):
+                if font_size != current_font_size:
+                    cr.set_font_size(font_size)
+                    current_font_size = font_size
                 cr.move_to(xi, yi)
                 cr.show_text(char)
 
@@ -1365,17 +1542,9 @@ class MoleculeDrawer(object):
             # Terminal atom - we require a horizontal arrangement if there are
             # more than just the heavy atom
             atom1 = next(iter(atom.bonds))
-            vector = self.coordinates[atoms.index(atom), :] - self.coordinates[atoms.index(atom1), :]
+            vector = self.coordinates[atom_indices[atom], :] - self.coordinates[atom_indices[atom1], :]
             if len(symbol) <= 1:
-                angle = math.atan2(vector[1], vector[0])
-                if 3 * math.pi / 4 <= angle or angle < -3 * math.pi / 4:
-                    orientation = 'l'
-                elif -3 * math.pi / 4 <= angle < -1 * math.pi / 4:
-                    orientation = 'b'
-                elif -1 * math.pi / 4 <= angle < 1 * math.pi / 4:
-                    orientation = 'r'
-                else:
-                    orientation = 't'
+                orientation = _get_orientation(math.atan2(vector[1], vector[0]))
             else:
                 if vector[1] <= 0:
                     orientation = 'b'
@@ -1385,25 +1554,22 @@ class MoleculeDrawer(object):
             # Internal atom
             # First try to see if there is a "preferred" side on which to place the
             # radical/charge data, i.e. if the bonds are unbalanced
-            vector = np.zeros(2, np.float64)
-            for atom1 in atom.bonds:
-                vector += self.coordinates[atoms.index(atom), :] - self.coordinates[atoms.index(atom1), :]
-            if np.linalg.norm(vector) < 1e-4:
+            bond_vectors = (self.coordinates[[atom_indices[atom1] for atom1 in atom.bonds], :] -
+                            self.coordinates[atom_indices[atom], :])
+            vector = -np.sum(bond_vectors, axis=0)
+            if math.hypot(vector[0], vector[1]) < 1e-4:
                 # All of the bonds are balanced, so we'll need to be more shrewd
-                angles = []
-                for atom1 in atom.bonds:
-                    vector = self.coordinates[atoms.index(atom1), :] - self.coordinates[atoms.index(atom), :]
-                    angles.append(math.atan2(vector[1], vector[0]))
+                angles = np.arctan2(bond_vectors[:, 1], bond_vectors[:, 0])
                 # Try one more time to see if we can use one of the four sides
                 # (due to there being no bonds in that quadrant)
                 # We don't even need a full 90 degrees open (using 60 degrees instead)
-                if all([1 * math.pi / 3 >= angle or angle >= 2 * math.pi / 3 for angle in angles]):
+                if np.all((1 * math.pi / 3 >= angles) | (angles >= 2 * math.pi / 3)):
                     orientation = 't'
-                elif all([-2 * math.pi / 3 >= angle or angle >= -1 * math.pi / 3 for angle in angles]):
+                elif np.all((-2 * math.pi / 3 >= angles) | (angles >= -1 * math.pi / 3)):
                     orientation = 'b'
-                elif all([-1 * math.pi / 6 >= angle or angle >= 1 * math.pi / 6 for angle in angles]):
+                elif np.all((-1 * math.pi / 6 >= angles) | (angles >= 1 * math.pi / 6)):
                     orientation = 'r'
-                elif all([5 * math.pi / 6 >= angle or angle >= -5 * math.pi / 6 for angle in angles]):
+                elif np.all((5 * math.pi / 6 >= angles) | (angles >= -5 * math.pi / 6)):
                     orientation = 'l'
                 else:
                     # If we still don't have it (e.g. when there are 4+ equally-
@@ -1411,18 +1577,9 @@ class MoleculeDrawer(object):
                     orientation = 'tr'
             else:
                 # There is an unbalanced side, so let's put the radical/charge data there
-                angle = math.atan2(vector[1], vector[0])
-                if 3 * math.pi / 4 <= angle or angle < -3 * math.pi / 4:
-                    orientation = 'l'
-                elif -3 * math.pi / 4 <= angle < -1 * math.pi / 4:
-                    orientation = 'b'
-                elif -1 * math.pi / 4 <= angle < 1 * math.pi / 4:
-                    orientation = 'r'
-                else:
-                    orientation = 't'
+                orientation = _get_orientation(math.atan2(vector[1], vector[0]))
 
-        cr.set_font_size(self.options['fontSizeNormal'])
-        extents = cr.text_extents(heavy_atom)
+        extents = self._get_text_extents(cr, heavy_atom, self.options['fontSizeNormal'])
 
         # (xi, yi) mark the center of the space in which to place the radicals and charges
         if orientation[0] == 'l':
@@ -1445,7 +1602,8 @@ class MoleculeDrawer(object):
             xi += 4
 
         # Get width and height
-        cr.set_font_size(self.options['fontSizeSubscript'])
+        font_size = self.options['fontSizeSubscript']
+        cr.set_font_size(font_size)
         width = 0.0
         height = 0.0
         if orientation[0] == 'b' or orientation[0] == 't':
@@ -1464,7 +1622,7 @@ class MoleculeDrawer(object):
             elif atom.charge < -1:
                 text = u'{0:d}\u2013'.format(abs(atom.charge))
             if text != '':
-                extents = cr.text_extents(text)
+                extents = self._get_text_extents(cr, text, font_size)
                 width += extents[2] + 1
                 height = extents[3]
         elif orientation[0] == 'l' or orientation[0] == 'r':
@@ -1483,7 +1641,7 @@ class MoleculeDrawer(object):
             elif atom.charge < -1:
                 text = u'{0:d}\u2013'.format(abs(atom.charge))
             if text != '':
-                extents = cr.text_extents(text)
+                extents = self._get_text_extents(cr, text, font_size)
                 height += extents[3] + 1
                 width = extents[2]
         # Move (xi, yi) to top left corner of space in which to draw radicals and charges
@@ -1502,13 +1660,13 @@ class MoleculeDrawer(object):
                 bounding_rect[3] = yi + height
 
         if orientation[0] == 'b' or orientation[0] == 't':
-            # Draw radical electrons first
-            for i in range(atom.radical_electrons):
-                cr.new_sub_path()
-                cr.arc(xi + 3 * i + 1, yi + height / 2, 1, 0, 2 * math.pi)
+            # Draw radical electrons first, filling all of them at once
+            if atom.radical_electrons > 0:
+                for i in range(atom.radical_electrons):
+                    cr.new_sub_path()
+                    cr.arc(xi + 3 * i + 1, yi + height / 2, 1, 0, 2 * math.pi)
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 cr.fill()
-            if atom.radical_electrons > 0:
                 xi += atom.radical_electrons * 2 + (atom.radical_electrons - 1) + 1
             # Draw charges second
             text = ''
@@ -1521,7 +1679,7 @@ class MoleculeDrawer(object):
             elif atom.charge < -1:
                 text = u'{0:d}\u2013'.format(abs(atom.charge))
             if text != '':
-                extents = cr.text_extents(text)
+                extents = self._get_text_extents(cr, text, font_size)
                 cr.move_to(xi, yi - extents[1])
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 cr.show_text(text)
@@ -1529,6 +1687,7 @@ class MoleculeDrawer(object):
             # Draw lone electron pairs            
             # Draw them for nitrogen containing molecules only
             if draw_lone_pairs:
+                cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 for i in range(atom.lone_pairs):
                     cr.new_sub_path()
                     if i == 0:
@@ -1560,21 +1719,23 @@ class MoleculeDrawer(object):
             elif atom.charge < -1:
                 text = u'{0:d}\u2013'.format(abs(atom.charge))
             if text != '':
-                extents = cr.text_extents(text)
+                extents = self._get_text_extents(cr, text, font_size)
                 cr.move_to(xi - extents[2] / 2, yi - extents[1])
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 cr.show_text(text)
             if atom.charge != 0:
                 yi += extents[3] + 1
-            # Draw radical electrons second
-            for i in range(atom.radical_electrons):
-                cr.new_sub_path()
-                cr.arc(xi + width / 2, yi + 3 * i + 1, 1, 0, 2 * math.pi)
+            # Draw radical electrons second, filling all of them at once
+            if atom.radical_electrons > 0:
+                for i in range(atom.radical_electrons):
+                    cr.new_sub_path()
+                    cr.arc(xi + width / 2, yi + 3 * i + 1, 1, 0, 2 * math.pi)
                 cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 cr.fill()
             # Draw lone electron pairs
             # Draw them for nitrogen species only
             if draw_lone_pairs:
+                cr.set_source_rgba(0.0, 0.0, 0.0, 1.0)
                 for i in range(atom.lone_pairs):
                     cr.new_sub_path()
                     if i == 0:
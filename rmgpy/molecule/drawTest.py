@@ -31,12 +31,14 @@
 This module contains unit tests of the rmgpy.molecule.atomtype module.
 """
 
+import math
 import os
 import os.path
 import unittest
 
 from rmgpy.molecule import Molecule
-from rmgpy.molecule.draw import MoleculeDrawer
+from rmgpy.molecule.draw import MoleculeDrawer, _coordinates_cache, _get_label, _get_occupied_positions, \
+    _get_orientation, _is_occupied, _propagate_labels
 from rmgpy.species import Species
 
 
@@ -53,6 +55,8 @@ class TestMoleculeDrawer(unittest.TestCase):
         """
         self.drawer = MoleculeDrawer()
         self.molecule = Molecule(smiles='CC(=O)CC')
+        # The coordinate cache is shared by all drawers, so start each test without it
+        _coordinates_cache.clear()
 
     def test_draw_png(self):
         """
@@ -116,6 +120,88 @@ class TestMoleculeDrawer(unittest.TestCase):
         self.assertIsInstance(surface, PDFSurface)
         self.assertGreater(width, height)
 
+    def test_draw_reuses_coordinates(self):
+        """
+        Test that drawing the same molecule again reuses its cached coordinates.
+        """
+        _surface, _cr, rect1 = self.drawer.draw(self.molecule, file_format='pdf')
+        self.assertEqual(len(_coordinates_cache), 1)
+        _surface, _cr, rect2 = MoleculeDrawer().draw(self.molecule.copy(deep=True), file_format='pdf')
+        self.assertEqual(len(_coordinates_cache), 1)
+        self.assertEqual(rect1, rect2)
+
+    def test_draw_reuses_coordinates_of_unsorted_atoms(self):
+        """
+        Test that cached coordinates match the atoms of a molecule whose atoms are not in sorted order.
+        """
+        molecule = Molecule().from_adjacency_list("""
+1  *1 C u0 p0 c0 {2,S} {5,S} {6,S} {7,S}
+2  *2 C u0 p0 c0 {1,S} {3,S} {8,S} {9,S}
+3  *3 C u0 p0 c0 {2,S} {4,D} {10,S}
+4  *4 O u0 p2 c0 {3,D}
+5     H u0 p0 c0 {1,S}
+6     H u0 p0 c0 {1,S}
+7     H u0 p0 c0 {1,S}
+8     H u0 p0 c0 {2,S}
+9     H u0 p0 c0 {2,S}
+10    H u0 p0 c0 {3,S}
+        """)
+        positions = []
+        for _ in range(2):
+            self.drawer.draw(molecule, file_format='pdf')
+            positions.append({atom.label: self.drawer.coordinates[i, :].tolist()
+                              for i, atom in enumerate(self.drawer.molecule.atoms)})
+        self.assertEqual(len(_coordinates_cache), 1)
+        self.assertEqual(sorted(positions[0]), ['*1', '*2', '*3', '*4'])
+        for label, (x, y) in positions[0].items():
+            self.assertAlmostEqual(positions[1][label][0], x)
+            self.assertAlmostEqual(positions[1][label][1], y)
+
+    def test_draw_unsorted_atoms_consistently(self):
+        """
+        Test that a molecule whose atoms are not in sorted order is drawn the same way when its coordinates are cached.
+        """
+        molecule = Molecule().from_adjacency_list("""
+1 O u0 p2 c0 {2,D}
+2 C u0 p0 c0 {1,D} {3,D}
+3 O u0 p2 c0 {2,D}
+        """)
+        self.drawer.draw(molecule, file_format='pdf')
+        symbols = self.drawer.symbols
+        self.drawer.draw(molecule, file_format='pdf')
+        self.assertEqual(len(_coordinates_cache), 1)
+        self.assertEqual(self.drawer.symbols, symbols)
+
+    def test_label_cumulated_double_bonds(self):
+        """
+        Test that carbon atoms with only double bonds to labeled atoms are labeled.
+        """
+        self.drawer.draw(Molecule(smiles='O=C=C=C=O'), file_format='pdf')
+        self.assertEqual(sorted(self.drawer.symbols), ['C', 'C', 'C', 'O', 'O'])
+        self.drawer.draw(self.molecule, file_format='pdf')
+        self.assertEqual(sorted(self.drawer.symbols), ['', '', '', '', 'O'])
+
+    def test_label_unsorted_atoms(self):
+        """
+        Test that labels are assigned to the right atoms when the atoms are not in sorted order.
+        """
+        molecule = Molecule().from_adjacency_list("""
+1  *1 C u0 p0 c0 {2,S} {6,S} {7,S} {8,S}
+2  *2 C u0 p0 c0 {1,S} {3,D} {9,S}
+3  *3 C u0 p0 c0 {2,D} {4,D}
+4  *4 C u0 p0 c0 {3,D} {5,D}
+5  *5 O u0 p2 c0 {4,D}
+6     H u0 p0 c0 {1,S}
+7     H u0 p0 c0 {1,S}
+8     H u0 p0 c0 {1,S}
+9     H u0 p0 c0 {2,S}
+        """)
+        # Draw twice so that both generated and cached coordinates are covered
+        for _ in range(2):
+            self.drawer.draw(molecule, file_format='pdf')
+            labels = {atom.label: symbol for atom, symbol in zip(self.drawer.molecule.atoms, self.drawer.symbols)}
+            self.assertEqual(labels, {'*1': '', '*2': '', '*3': 'C', '*4': 'C', '*5': 'O'})
+
     def test_draw_non_standard_bonds(self):
 
         spec = Species().from_smiles('[CH2]C=C[CH2]')
@@ -151,6 +237,80 @@ class TestMoleculeDrawer(unittest.TestCase):
         surface, _cr, (_xoff, _yoff, _width, _height) = self.drawer.draw(molecule, file_format='pdf')
         self.assertIsInstance(surface, PDFSurface)
 
+
+class TestGetOrientation(unittest.TestCase):
+    """
+    Contains unit tests of the _get_orientation function.
+    """
+
+    def test_cardinal_directions(self):
+        """
+        Test that the eight compass directions are assigned to the expected sides.
+        """
+        for (x, y), orientation in [((1, 0), 'r'), ((1, 1), 't'), ((0, 1), 't'), ((-1, 1), 'l'),
+                                    ((-1, 0), 'l'), ((-1, -1), 'b'), ((0, -1), 'b'), ((1, -1), 'r')]:
+            self.assertEqual(_get_orientation(math.atan2(y, x)), orientation)
+
+    def test_sector_boundaries(self):
+        """
+        Test that each side covers the half-open 90 degree sector centered on its axis.
+        """
+        for angle, orientation in [(-3 * math.pi / 4, 'b'), (-math.pi / 4, 'r'), (math.pi / 4, 't'),
+                                   (3 * math.pi / 4, 'l'), (math.pi, 'l'), (-math.pi, 'l')]:
+            self.assertEqual(_get_orientation(angle), orientation)
+            self.assertEqual(_get_orientation(angle + 0.01), orientation)
+
+
+class TestIsOccupied(unittest.TestCase):
+    """
+    Contains unit tests of the _is_occupied function.
+    """
+
+    def test_is_occupied_across_cell_boundaries(self):
+        """
+        Test that positions closer than the tolerance are occupied even if they lie in different grid cells.
+        """
+        occupied_positions = _get_occupied_positions([(0.99995, 0.0), (0.0, -1.0)])
+        self.assertTrue(_is_occupied(1.00004, 0.0, occupied_positions))
+        self.assertTrue(_is_occupied(0.99995, 0.00009, occupied_positions))
+        self.assertTrue(_is_occupied(0.0, -0.99991, occupied_positions))
+        self.assertFalse(_is_occupied(1.00006, 0.0, occupied_positions))
+        self.assertFalse(_is_occupied(0.0, 1.0, occupied_positions))
+
+
+class TestGetLabel(unittest.TestCase):
+    """
+    Contains unit tests of the _get_label function.
+    """
+
+    def test_get_label(self):
+        """
+        Test that implicit hydrogens are appended to the atom symbol.
+        """
+        self.assertEqual(_get_label('O', 0), 'O')
+        self.assertEqual(_get_label('O', 1), 'OH')
+        self.assertEqual(_get_label('C', 3), 'CH3')
+        self.assertEqual(_get_label('Si', 12), 'SiH12')
+        self.assertIs(_get_label('C', 3), _get_label('C', 3))
+
+
+class TestPropagateLabels(unittest.TestCase):
+    """
+    Contains unit tests of the _propagate_labels function.
+    """
+
+    def test_propagate_through_multiple_bonds(self):
+        """
+        Test that labels only spread to atoms with all double or triple bonds.
+        """
+        # Chain 0-1-2-3-4 where atoms 1 and 2 have only multiple bonds
+        indptr = [0, 1, 3, 5, 7, 8]
+        neighbors = [1, 0, 2, 1, 3, 2, 4, 3]
+        multiple = [False, True, True, False, False]
+        labeled = bytearray([1, 0, 0, 0, 0])
+        self.assertEqual(sorted(_propagate_labels(indptr, neighbors, multiple, labeled)), [1, 2])
+        self.assertEqual(labeled, bytearray([1, 1, 1, 0, 0]))
+
 ################################################################################
 
 if __name__ == '__main__':
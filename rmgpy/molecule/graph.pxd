@@ -92,6 +92,8 @@ cdef class Graph(object):
 
     cpdef remove_vertex(self, Vertex vertex)
 
+    cpdef remove_vertices(self, list vertices)
+
     cpdef remove_edge(self, Edge edge)
 
     cpdef update_connectivity_values(self)
@@ -301,6 +301,22 @@ cdef class Graph(object):
         vertex.edges = dict()
         self.vertices.remove(vertex)
 
+    cpdef remove_vertices(self, list vertices):
+        """
+        Remove each vertex in the list `vertices` and all edges associated with
+        them from the graph. This is equivalent to calling
+        :meth:`remove_vertex` for each vertex, but filters the vertex list only
+        once. Does not remove vertices that no longer have any edges as a
+        result of this removal.
+        """
+        cdef Vertex vertex, vertex2
+        cdef set removed = set(vertices)
+        for vertex in vertices:
+            for vertex2 in vertex.edges:
+                del vertex2.edges[vertex]
+            vertex.edges = dict()
+        self.vertices = [vertex for vertex in self.vertices if vertex not in removed]
+
     cpdef remove_edge(self, Edge edge):
         """
         Remove the specified `edge` from the graph.
@@ -167,6 +167,19 @@ class TestGraph(unittest.TestCase):
         for v in self.graph.vertices:
             self.assertFalse(vertex in v.edges)
 
+    def test_remove_vertices(self):
+        """
+        Test the Graph.remove_vertices() method.
+        """
+        vertices = [self.graph.vertices[1], self.graph.vertices[2]]
+        remaining = [v for v in self.graph.vertices if v not in vertices]
+        self.graph.remove_vertices(vertices)
+        self.assertEqual(self.graph.vertices, remaining)
+        for vertex in vertices:
+            self.assertEqual(vertex.edges, {})
+            for v in self.graph.vertices:
+                self.assertFalse(vertex in v.edges)
+
     def test_remove_edge(self):
         """
         Test the Graph.remove_edge() method.
@@ -162,6 +162,8 @@ cdef class Molecule(Graph):
 
     cpdef remove_atom(self, Atom atom)
 
+    cpdef remove_atoms(self, list atoms)
+
     cpdef remove_bond(self, Bond bond)
 
     cpdef remove_van_der_waals_bonds(self)
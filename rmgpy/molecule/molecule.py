@@ -1086,6 +1086,15 @@ class Molecule(Graph):
         self._fingerprint = self._inchi = self._smiles = None
         return self.remove_vertex(atom)
 
+    def remove_atoms(self, atoms):
+        """
+        Remove each atom in the list `atoms` and all bonds associated with them
+        from the graph. Does not remove atoms that no longer have any bonds as
+        a result of this removal.
+        """
+        self._fingerprint = self._inchi = self._smiles = None
+        return self.remove_vertices(atoms)
+
     def remove_bond(self, bond):
         """
         Remove the bond between atoms `atom1` and `atom2` from the graph.